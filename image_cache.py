@@ -0,0 +1,108 @@
+import os
+import hashlib
+import numpy as np
+from PIL import Image
+
+# Constantes
+DEFAULT_CACHE_FOLDER = ".image_cache"
+DEFAULT_CACHE_MAX_MB = 2048
+CACHE_EXTENSION = ".npy"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_source_file(image_path):
+    # Key the cache by the content of the source file, so an edited JPEG never hits a stale entry
+    digest = hashlib.sha1()
+    with open(image_path, 'rb') as source_file:
+        for chunk in iter(lambda: source_file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_pixels_path(cache_dir, key):
+    return os.path.join(cache_dir, key + CACHE_EXTENSION)
+
+
+def store_pixels(cache_dir, key, pixels):
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+
+    # Write to a temporary file and rename it, so other workers never map a half-written entry
+    final_path = cached_pixels_path(cache_dir, key)
+    temp_path = f"{final_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            np.save(temp_file, pixels)
+        try:
+            os.replace(temp_path, final_path)
+        except PermissionError:
+            # Another worker stored the same image and has it mapped (Windows), use its entry
+            if not os.path.exists(final_path):
+                raise
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return final_path
+
+
+def evict_cache(cache_dir, max_bytes, keep_path=None):
+    # Drop the least recently used entries (oldest mtime) until the cache fits in max_bytes
+    entries = []
+    total_bytes = 0
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(CACHE_EXTENSION):
+            continue
+        path = os.path.join(cache_dir, filename)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue  # Removed by another worker in the meantime
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total_bytes += stat.st_size
+
+    entries.sort()
+    for mtime, size, path in entries:
+        if total_bytes <= max_bytes:
+            break
+        if keep_path is not None and os.path.abspath(path) == os.path.abspath(keep_path):
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue  # Still mapped by another process (Windows), try the next one
+        total_bytes -= size
+    return total_bytes
+
+
+def load_cached_pixels(image_path, cache_dir=DEFAULT_CACHE_FOLDER, max_mb=DEFAULT_CACHE_MAX_MB):
+    key = hash_source_file(image_path)
+    path = cached_pixels_path(cache_dir, key)
+
+    if os.path.exists(path):
+        try:
+            pixels = np.load(path, mmap_mode='r')
+            os.utime(path)  # Mark as recently used for the LRU eviction
+            return pixels
+        except (OSError, ValueError):
+            print(f"Discarding unreadable cache entry {path}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    # Cache miss: decode once, store the raw RGB pixels and map them back from disk
+    with Image.open(image_path) as image:
+        pixels = np.asarray(image.convert('RGB'))
+    path = store_pixels(cache_dir, key, pixels)
+    evict_cache(cache_dir, max_mb * 1024 * 1024, keep_path=path)
+    return np.load(path, mmap_mode='r')
+
+
+def load_image(image_path, cache_dir=None, max_mb=DEFAULT_CACHE_MAX_MB):
+    # Without a cache folder behave exactly like Image.open
+    if cache_dir is None:
+        return Image.open(image_path)
+
+    return Image.fromarray(load_cached_pixels(image_path, cache_dir, max_mb))
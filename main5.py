@@ -1,6 +1,7 @@
 import os
 from PIL import Image, ImageEnhance, ImageStat, ImageDraw, ImageFont
 import argparse
+from image_cache import load_image, DEFAULT_CACHE_MAX_MB
 
 # Constantes
 RESOURCES_FOLDER = "resources"
@@ -91,7 +92,12 @@ def create_comparison_image(original_image, processed_image, filename, brightnes
     print(f"Saved comparison image as {comparison_path}")
 
 
-def process_images(additional_temperature_percentage, additional_brightness_percentage, bronze_percentage):
+def process_images(additional_temperature_percentage, additional_brightness_percentage, bronze_percentage,
+                   cache_dir=None, cache_max_mb=DEFAULT_CACHE_MAX_MB, mask=False):
+    # La máscara de piel necesita OpenCV, solo se carga si se pide
+    if mask:
+        from skin_mask import detect_faces, build_skin_mask, apply_with_mask
+
     # Crear el directorio para las imágenes procesadas y comparadas si no existen
     if not os.path.exists(PROCESSED_FOLDER):
         os.makedirs(PROCESSED_FOLDER)
@@ -118,11 +124,19 @@ def process_images(additional_temperature_percentage, additional_brightness_perc
         if filename.lower().endswith(
                 ('.png', '.jpg', '.jpeg', '.bmp', '.gif')) and filename != "procesadas" and filename != "comparadas":
             image_path = os.path.join(RESOURCES_FOLDER, filename)
-            image = Image.open(image_path)
+            image = load_image(image_path, cache_dir, cache_max_mb)
             print(f"Processing {filename}...")
             processed_image = adjust_brightness(image, total_brightness_adjust)
             processed_image = adjust_temperature(processed_image, total_temperature_adjust)
-            processed_image = adjust_bronze(processed_image, bronze_adjust)
+            if mask:
+                # Only tan the skin of the subject, not the background or the stage lighting
+                subject_mask, face_regions = build_skin_mask(image, detect_faces(image))
+                if subject_mask.getbbox() is None:
+                    print(f"No skin-coloured face detected in {filename}, skipping the bronze effect.")
+                processed_image = apply_with_mask(processed_image, subject_mask,
+                                                  lambda region: adjust_bronze(region, bronze_adjust))
+            else:
+                processed_image = adjust_bronze(processed_image, bronze_adjust)
             output_path = os.path.join(PROCESSED_FOLDER, filename)
             processed_image.save(output_path)
             print(f"Saved processed image as {output_path}")
@@ -141,7 +155,14 @@ if __name__ == "__main__":
                         help="Additional brightness percentage to add (default is 0).")
     parser.add_argument("--bronze", type=float, default=0,
                         help="Additional bronze percentage to add for a tanned effect (default is 0).")
+    parser.add_argument("--cache_dir", type=str,
+                        help="Folder for the memory-mapped cache of decoded images (disabled if not given).")
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help=f"Maximum size of the decoded image cache in MB (default is {DEFAULT_CACHE_MAX_MB}).")
+    parser.add_argument("--mask", action="store_true",
+                        help="Apply the bronze effect only on the skin of the subject instead of the whole image.")
 
     args = parser.parse_args()
 
-    process_images(args.additional_temperature, args.additional_brightness, args.bronze)
+    process_images(args.additional_temperature, args.additional_brightness, args.bronze,
+                   args.cache_dir, args.cache_max_mb, args.mask)
@@ -3,6 +3,8 @@ import cv2
 import numpy as np
 from PIL import Image, ImageEnhance, ImageStat, ImageDraw, ImageFont
 import argparse
+from image_cache import load_image, DEFAULT_CACHE_MAX_MB
+from skin_mask import detect_faces, build_skin_mask, restrict_mask_to_regions, apply_with_mask
 
 # Ruta al archivo Haarcascade
 CASCADE_PATH = r'venv\Lib\site-packages\cv2\data\haarcascade_frontalface_default.xml'
@@ -78,6 +80,16 @@ def apply_adjustments_on_region(image, region, brightness_adjust, temperature_ad
     return image
 
 
+def apply_adjustments_with_mask(image, mask, brightness_adjust, temperature_adjust, bronze_adjust):
+    # Apply adjustments only where the mask is set, blending at its edges
+    def adjust_region(region_image):
+        region_image = adjust_brightness(region_image, brightness_adjust)
+        region_image = adjust_temperature(region_image, temperature_adjust)
+        return adjust_bronze(region_image, bronze_adjust)
+
+    return apply_with_mask(image, mask, adjust_region)
+
+
 def detect_face(image):
     # Convert image to grayscale for face detection
     gray_image = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
@@ -127,7 +139,8 @@ def create_comparison_image(original_image, processed_image, filename, body_adju
     print(f"Saved comparison image as {comparison_path}")
 
 
-def process_images(body_adjustments, face_adjustments):
+def process_images(body_adjustments, face_adjustments, cache_dir=None, cache_max_mb=DEFAULT_CACHE_MAX_MB,
+                   mask=False):
     # Crear el directorio para las imágenes procesadas y comparadas si no existen
     if not os.path.exists(PROCESSED_FOLDER):
         os.makedirs(PROCESSED_FOLDER)
@@ -160,30 +173,50 @@ def process_images(body_adjustments, face_adjustments):
         if filename.lower().endswith(
                 ('.png', '.jpg', '.jpeg', '.bmp', '.gif')) and filename != "procesadas" and filename != "comparadas":
             image_path = os.path.join(RESOURCES_FOLDER, filename)
-            image = Image.open(image_path)
+            image = load_image(image_path, cache_dir, cache_max_mb)
             print(f"Processing {filename}...")
 
-            # Convert the PIL image to OpenCV format
-            cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-            face_region = detect_face(cv_image)
+            if mask:
+                # Build the skin mask of the subject on a small proxy, seeded from every detected face
+                face_regions = detect_faces(image, CASCADE_PATH)
+                subject_mask, face_regions = build_skin_mask(image, face_regions)
+                if subject_mask.getbbox() is None:
+                    print(f"No skin-coloured face detected in {filename}, skipping the bronze and face adjustments.")
 
-            if face_region:
-                # Apply adjustments on the entire body first
+                # Brightness and temperature on the entire body, bronze only on the masked skin
                 processed_image = adjust_brightness(image, body_adjustments['brightness'])
                 processed_image = adjust_temperature(processed_image, body_adjustments['temperature'])
-                processed_image = adjust_bronze(processed_image, body_adjustments['bronze'])
+                processed_image = apply_with_mask(processed_image, subject_mask,
+                                                  lambda region: adjust_bronze(region, body_adjustments['bronze']))
 
-                # Apply specific adjustments on the face
-                processed_image = apply_adjustments_on_region(processed_image, face_region,
+                # Apply specific adjustments on the skin of the faces that seeded the mask
+                processed_image = apply_adjustments_with_mask(processed_image,
+                                                              restrict_mask_to_regions(subject_mask, face_regions),
                                                               face_adjustments['brightness'],
                                                               face_adjustments['temperature'],
                                                               face_adjustments['bronze'])
             else:
-                print(f"No face detected in {filename}, applying body adjustments to the entire image.")
-                # If no face is detected, apply body adjustments to the entire image
-                processed_image = adjust_brightness(image, body_adjustments['brightness'])
-                processed_image = adjust_temperature(processed_image, body_adjustments['temperature'])
-                processed_image = adjust_bronze(processed_image, body_adjustments['bronze'])
+                # Convert the PIL image to OpenCV format
+                cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+                face_region = detect_face(cv_image)
+
+                if face_region:
+                    # Apply adjustments on the entire body first
+                    processed_image = adjust_brightness(image, body_adjustments['brightness'])
+                    processed_image = adjust_temperature(processed_image, body_adjustments['temperature'])
+                    processed_image = adjust_bronze(processed_image, body_adjustments['bronze'])
+
+                    # Apply specific adjustments on the face
+                    processed_image = apply_adjustments_on_region(processed_image, face_region,
+                                                                  face_adjustments['brightness'],
+                                                                  face_adjustments['temperature'],
+                                                                  face_adjustments['bronze'])
+                else:
+                    print(f"No face detected in {filename}, applying body adjustments to the entire image.")
+                    # If no face is detected, apply body adjustments to the entire image
+                    processed_image = adjust_brightness(image, body_adjustments['brightness'])
+                    processed_image = adjust_temperature(processed_image, body_adjustments['temperature'])
+                    processed_image = adjust_bronze(processed_image, body_adjustments['bronze'])
 
             output_path = os.path.join(PROCESSED_FOLDER, filename)
             processed_image.save(output_path)
@@ -207,6 +240,16 @@ if __name__ == "__main__":
     parser.add_argument("--face_temperature", type=float, help="Additional temperature percentage to add to the face.")
     parser.add_argument("--face_bronze", type=float, help="Additional bronze percentage to add to the face.")
 
+    # Caché de imágenes decodificadas
+    parser.add_argument("--cache_dir", type=str,
+                        help="Folder for the memory-mapped cache of decoded images (disabled if not given).")
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_CACHE_MAX_MB,
+                        help=f"Maximum size of the decoded image cache in MB (default is {DEFAULT_CACHE_MAX_MB}).")
+
+    # Máscara de piel
+    parser.add_argument("--mask", action="store_true",
+                        help="Apply the bronze and face adjustments only on the skin of the subject.")
+
     args = parser.parse_args()
 
     body_adjustments = {
@@ -221,4 +264,4 @@ if __name__ == "__main__":
         'bronze': args.face_bronze
     }
 
-    process_images(body_adjustments, face_adjustments)
+    process_images(body_adjustments, face_adjustments, args.cache_dir, args.cache_max_mb, args.mask)
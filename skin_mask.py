@@ -0,0 +1,124 @@
+import os
+import cv2
+import numpy as np
+from PIL import Image
+
+# Ruta al archivo Haarcascade
+CASCADE_PATH = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+
+# Constantes
+PROXY_SIZE = 256  # Longest side of the image the mask is computed on
+DEFAULT_CR_RANGE = (135, 173)  # Skin range in YCrCb the seeded ranges are clamped to, Cr above the green backdrop (~133)
+DEFAULT_CB_RANGE = (77, 127)
+SEED_PERCENTILES = (10, 90)  # Range of the face pixels used as seed, robust to eyes, mouth and hair
+SEED_MARGIN = 2
+FACE_SEED_INSET = 0.25  # Only seed from the centre of the face box, away from hair and background
+SUBJECT_EXPAND = 1.0  # Keep skin regions within one face size around each face
+FEATHER_SIZE = 5  # Blur of the proxy mask so the transform fades out at the edges
+
+
+def detect_faces(image, cascade_path=CASCADE_PATH):
+    # Full resolution and the exact conversion of main_opencv1.detect_face, so faces[0] is the same box.
+    # Detecting on a downscaled copy is cheaper but does not pass verify_fast_paths.py
+    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    gray_image = cv2.cvtColor(cv_image, cv2.COLOR_RGB2GRAY)
+    face_cascade = cv2.CascadeClassifier(cascade_path)
+    faces = face_cascade.detectMultiScale(gray_image, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
+    return [(x, y, x + w, y + h) for (x, y, w, h) in faces]
+
+
+def scale_region(region, scale, inset=0.0, expand=0.0, size=None):
+    left, top, right, bottom = region
+    width, height = right - left, bottom - top
+    margin_x = width * (expand - inset)
+    margin_y = height * (expand - inset)
+    scaled = [int(round((left - margin_x) * scale)), int(round((top - margin_y) * scale)),
+              int(round((right + margin_x) * scale)), int(round((bottom + margin_y) * scale))]
+    if size is not None:
+        scaled = [min(max(scaled[0], 0), size[0]), min(max(scaled[1], 0), size[1]),
+                  min(max(scaled[2], 0), size[0]), min(max(scaled[3], 0), size[1])]
+    return tuple(scaled)
+
+
+def is_skin_seed(cr, cb, region):
+    # Discard false detections whose centre is not skin coloured
+    left, top, right, bottom = region
+    if right <= left or bottom <= top:
+        return False
+    cr_median = np.median(cr[top:bottom, left:right])
+    cb_median = np.median(cb[top:bottom, left:right])
+    return (DEFAULT_CR_RANGE[0] <= cr_median <= DEFAULT_CR_RANGE[1] and
+            DEFAULT_CB_RANGE[0] <= cb_median <= DEFAULT_CB_RANGE[1])
+
+
+def seeded_range(channel, seed_regions, default_range):
+    seeds = np.concatenate([channel[top:bottom, left:right].ravel() for left, top, right, bottom in seed_regions])
+    low, high = np.percentile(seeds, SEED_PERCENTILES)
+    return max(low - SEED_MARGIN, default_range[0]), min(high + SEED_MARGIN, default_range[1])
+
+
+def build_skin_mask(image, face_regions, proxy_size=PROXY_SIZE):
+    # Work on a small proxy, the mask does not need the full resolution.
+    # Returns the mask and the face regions that were skin coloured enough to seed it
+    scale = min(proxy_size / float(max(image.size)), 1.0)
+    proxy_width = max(int(round(image.width * scale)), 1)
+    proxy_height = max(int(round(image.height * scale)), 1)
+    proxy = image.resize((proxy_width, proxy_height), Image.BILINEAR, reducing_gap=2.0).convert('RGB')
+    ycrcb = cv2.cvtColor(np.asarray(proxy), cv2.COLOR_RGB2YCrCb)
+    cr, cb = ycrcb[:, :, 1], ycrcb[:, :, 2]
+
+    # Seed the skin thresholds from the detected faces
+    seeds = [(region, scale_region(region, scale, inset=FACE_SEED_INSET, size=proxy.size)) for region in face_regions]
+    seeds = [(region, seed_region) for region, seed_region in seeds if is_skin_seed(cr, cb, seed_region)]
+    face_regions = [region for region, seed_region in seeds]
+    if not seeds:
+        # Without a face to seed from, a generic threshold would also pick the backdrop and stage lighting
+        return Image.new('L', image.size, 0), []
+
+    seed_regions = [seed_region for region, seed_region in seeds]
+    cr_range = seeded_range(cr, seed_regions, DEFAULT_CR_RANGE)
+    cb_range = seeded_range(cb, seed_regions, DEFAULT_CB_RANGE)
+
+    mask = ((cr >= cr_range[0]) & (cr <= cr_range[1]) & (cb >= cb_range[0]) & (cb <= cb_range[1]))
+    mask = mask.astype(np.uint8) * 255
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+
+    # Keep only the skin connected to the subject, not warm stage lighting elsewhere in the frame
+    subject = np.zeros_like(mask)
+    for region in face_regions:
+        left, top, right, bottom = scale_region(region, scale, expand=SUBJECT_EXPAND, size=proxy.size)
+        subject[top:bottom, left:right] = 1
+
+    _, labels = cv2.connectedComponents(mask)
+    kept_labels = np.unique(labels[(subject == 1) & (mask > 0)])
+    mask = np.isin(labels, kept_labels[kept_labels != 0]).astype(np.uint8) * 255
+
+    mask = cv2.GaussianBlur(mask, (FEATHER_SIZE, FEATHER_SIZE), 0)
+
+    # Upsample the proxy mask back to the size of the image
+    return Image.fromarray(mask).resize(image.size, Image.BILINEAR), face_regions
+
+
+def restrict_mask_to_regions(mask, regions):
+    restricted = Image.new('L', mask.size, 0)
+    for region in regions:
+        region = tuple(int(value) for value in region)
+        restricted.paste(mask.crop(region), region)
+    return restricted
+
+
+def apply_with_mask(image, mask, transform):
+    # Only transform the bounding box of the mask, the rest of the frame is left untouched
+    bbox = mask.getbbox()
+    if bbox is None:
+        return image
+
+    region_image = image.crop(bbox)
+    blended = Image.composite(transform(region_image), region_image, mask.crop(bbox))
+
+    # Paste the blended region back onto the original image
+    image.paste(blended, bbox)
+    return image
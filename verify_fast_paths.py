@@ -0,0 +1,290 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import cv2
+import numpy as np
+from PIL import Image
+
+import main5
+import main_opencv1
+from image_cache import load_image
+from skin_mask import detect_faces
+
+# Constantes
+RESOURCES_FOLDER = main5.RESOURCES_FOLDER
+PROCESSED_FOLDER = main5.PROCESSED_FOLDER
+CORRECTED_IMAGE_PATH = main5.CORRECTED_IMAGE_PATH
+ORIGINAL_IMAGE_PATH = main5.ORIGINAL_IMAGE_PATH
+CACHE_FOLDER = os.path.join(tempfile.gettempdir(), "image_correction_verify_cache")
+FALLBACK_CASCADE_PATH = os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+
+# Tolerancias por defecto
+DEFAULT_MAX_DIFF = 2
+DEFAULT_MIN_PSNR = 45.0
+DEFAULT_MIN_ACCEPTED_PSNR = 38.0
+DEFAULT_MIN_IOU = 0.9
+DEFAULT_MAX_STAT_DIFF = 1e-3
+
+# Ajustes de la cara para el recorrido de main_opencv1.py
+DEFAULT_FACE_BRIGHTNESS = 1.1
+DEFAULT_FACE_TEMPERATURE = 0
+DEFAULT_FACE_BRONZE = 10
+
+# Implementaciones de referencia: lo que usan hoy main5.py y main_opencv1.py
+REFERENCE_ENGINE = {
+    'load': Image.open,
+    'brightness_difference': main5.calculate_brightness_difference,
+    'temperature_difference': main5.calculate_temperature_difference,
+    'adjust_brightness': main5.adjust_brightness,
+    'adjust_temperature': main5.adjust_temperature,
+    'adjust_bronze': main5.adjust_bronze,
+    'detect_face': main_opencv1.detect_face,
+}
+
+
+def detect_first_face(cv_image):
+    # skin_mask.detect_faces (used by --mask) as a drop-in for detect_face: first box or None
+    faces = detect_faces(Image.fromarray(cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)))
+    return faces[0] if faces else None
+
+
+# Motores alternativos: cada uno reemplaza solo las funciones que optimiza
+ENGINES = {
+    'cache': dict(REFERENCE_ENGINE, load=lambda path: load_image(path, CACHE_FOLDER)),
+    'skin_mask': dict(REFERENCE_ENGINE, detect_face=detect_first_face),
+}
+
+
+def calculate_psnr(reference_pixels, pixels):
+    mse = np.mean((reference_pixels.astype(np.float64) - pixels.astype(np.float64)) ** 2)
+    if mse == 0:
+        return float('inf')
+    return 10 * np.log10(255 ** 2 / mse)
+
+
+def calculate_max_diff(reference_pixels, pixels):
+    return int(np.max(np.abs(reference_pixels.astype(np.int16) - pixels.astype(np.int16))))
+
+
+def calculate_iou(reference_box, box):
+    # Two missing faces agree, one missing face does not
+    if reference_box is None or box is None:
+        return 1.0 if reference_box is None and box is None else 0.0
+
+    left = max(reference_box[0], box[0])
+    top = max(reference_box[1], box[1])
+    right = min(reference_box[2], box[2])
+    bottom = min(reference_box[3], box[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+
+    reference_area = (reference_box[2] - reference_box[0]) * (reference_box[3] - reference_box[1])
+    area = (box[2] - box[0]) * (box[3] - box[1])
+    return intersection / float(reference_area + area - intersection)
+
+
+def calculate_adjustments(engine, additional_temperature_percentage, additional_brightness_percentage):
+    # Same arithmetic as main5.process_images
+    corrected_image = engine['load'](CORRECTED_IMAGE_PATH)
+    original_image = engine['load'](ORIGINAL_IMAGE_PATH)
+
+    brightness_adjust = engine['brightness_difference'](corrected_image, original_image)
+    base_temperature_adjust = engine['temperature_difference'](corrected_image, original_image)
+
+    total_temperature_adjust = base_temperature_adjust * (1 + additional_temperature_percentage / 100)
+    total_brightness_adjust = brightness_adjust * (1 + additional_brightness_percentage / 100)
+    return total_brightness_adjust, total_temperature_adjust
+
+
+def run_pipeline(engine, image_path, brightness_adjust, temperature_adjust, bronze_adjust, repeat):
+    # Best of `repeat` runs, so the timing is not dominated by a cold disk or cache
+    best_time = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        image = engine['load'](image_path)
+        processed_image = engine['adjust_brightness'](image, brightness_adjust)
+        processed_image = engine['adjust_temperature'](processed_image, temperature_adjust)
+        processed_image = engine['adjust_bronze'](processed_image, bronze_adjust)
+        pixels = np.asarray(processed_image)
+        best_time = min(best_time, time.perf_counter() - start)
+    return pixels, image, best_time
+
+
+def run_face_pipeline(engine, image, body_adjustments, face_adjustments):
+    # Same steps as main_opencv1.process_images: body adjustments first, then the detected face region
+    processed_image = engine['adjust_brightness'](image, body_adjustments[0])
+    processed_image = engine['adjust_temperature'](processed_image, body_adjustments[1])
+    processed_image = engine['adjust_bronze'](processed_image, body_adjustments[2])
+
+    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    start = time.perf_counter()
+    face_region = engine['detect_face'](cv_image)
+    face_time = time.perf_counter() - start
+
+    if face_region:
+        region = tuple(int(value) for value in face_region)
+        region_image = processed_image.crop(region)
+        region_image = engine['adjust_brightness'](region_image, face_adjustments[0])
+        region_image = engine['adjust_temperature'](region_image, face_adjustments[1])
+        region_image = engine['adjust_bronze'](region_image, face_adjustments[2])
+        processed_image.paste(region_image, region)
+    return np.asarray(processed_image), face_region, face_time
+
+
+def list_images(limit):
+    filenames = [filename for filename in sorted(os.listdir(RESOURCES_FOLDER))
+                 if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif'))]
+    return filenames[:limit] if limit else filenames
+
+
+def verify(engine_names, additional_temperature_percentage, additional_brightness_percentage, bronze_percentage,
+           face_adjustments, tolerances, repeat, limit, check_faces):
+    if not os.path.exists(main_opencv1.CASCADE_PATH):
+        main_opencv1.CASCADE_PATH = FALLBACK_CASCADE_PATH
+
+    failures = []
+
+    reference_adjustments = calculate_adjustments(REFERENCE_ENGINE, additional_temperature_percentage,
+                                                  additional_brightness_percentage)
+    print(f"Reference - Brillo: {reference_adjustments[0]:.6f}, Temp: {reference_adjustments[1]:.6f}")
+
+    engine_adjustments = {}
+    for name in engine_names:
+        engine_adjustments[name] = calculate_adjustments(ENGINES[name], additional_temperature_percentage,
+                                                         additional_brightness_percentage)
+        stat_diff = max(abs(engine_value - reference_value) for engine_value, reference_value
+                        in zip(engine_adjustments[name], reference_adjustments))
+        print(f"{name} - Brillo: {engine_adjustments[name][0]:.6f}, Temp: {engine_adjustments[name][1]:.6f}, "
+              f"diff: {stat_diff:.2e}")
+        if stat_diff > tolerances['max_stat_diff']:
+            failures.append(f"{name}: reference stats differ by {stat_diff:.2e}")
+
+    # Face detection is only compared for engines that replace detect_face
+    face_engines = [name for name in engine_names
+                    if check_faces and ENGINES[name]['detect_face'] is not REFERENCE_ENGINE['detect_face']]
+
+    totals = {name: [0.0, 0.0] for name in ['reference'] + engine_names}
+
+    for filename in list_images(limit):
+        image_path = os.path.join(RESOURCES_FOLDER, filename)
+        print(f"Verifying {filename}...")
+
+        reference_pixels, reference_image, reference_time = run_pipeline(
+            REFERENCE_ENGINE, image_path, *reference_adjustments, bronze_percentage, repeat)
+        totals['reference'][0] += reference_time
+
+        # La referencia tiene que seguir reproduciendo las imágenes aceptadas
+        accepted_path = os.path.join(PROCESSED_FOLDER, filename)
+        if os.path.exists(accepted_path):
+            accepted_pixels = np.asarray(Image.open(accepted_path).convert('RGB'))
+            accepted_psnr = calculate_psnr(accepted_pixels, reference_pixels)
+            print(f"  accepted   max diff {calculate_max_diff(accepted_pixels, reference_pixels):3d}  "
+                  f"PSNR {accepted_psnr:6.2f} dB")
+            if accepted_psnr < tolerances['min_accepted_psnr']:
+                failures.append(f"{filename}: reference PSNR {accepted_psnr:.2f} dB against accepted output")
+
+        if face_engines:
+            reference_face_pixels, reference_face, reference_face_time = run_face_pipeline(
+                REFERENCE_ENGINE, reference_image, (*reference_adjustments, bronze_percentage), face_adjustments)
+            totals['reference'][1] += reference_face_time
+
+        for name in engine_names:
+            engine = ENGINES[name]
+            pixels, image, engine_time = run_pipeline(engine, image_path, *engine_adjustments[name],
+                                                      bronze_percentage, repeat)
+            totals[name][0] += engine_time
+
+            max_diff = calculate_max_diff(reference_pixels, pixels)
+            psnr = calculate_psnr(reference_pixels, pixels)
+            line = (f"  {name:10s} max diff {max_diff:3d}  PSNR {psnr:6.2f} dB  "
+                    f"speedup {reference_time / engine_time:5.2f}x")
+            if max_diff > tolerances['max_diff'] or psnr < tolerances['min_psnr']:
+                failures.append(f"{filename} [{name}]: max diff {max_diff}, PSNR {psnr:.2f} dB")
+
+            print(line)
+
+            if name in face_engines:
+                face_pixels, face_region, face_time = run_face_pipeline(
+                    engine, image, (*engine_adjustments[name], bronze_percentage), face_adjustments)
+                totals[name][1] += face_time
+                iou = calculate_iou(reference_face, face_region)
+                face_max_diff = calculate_max_diff(reference_face_pixels, face_pixels)
+                face_psnr = calculate_psnr(reference_face_pixels, face_pixels)
+                print(f"  {name:10s} face path max diff {face_max_diff:3d}  PSNR {face_psnr:6.2f} dB  "
+                      f"IoU {iou:4.2f}  detection speedup {reference_face_time / face_time:5.2f}x")
+                if iou < tolerances['min_iou']:
+                    failures.append(f"{filename} [{name}]: face IoU {iou:.2f}")
+                if face_max_diff > tolerances['max_diff'] or face_psnr < tolerances['min_psnr']:
+                    failures.append(f"{filename} [{name}]: face path max diff {face_max_diff}, "
+                                    f"PSNR {face_psnr:.2f} dB")
+
+    # Resumen
+    print("Summary:")
+    for name in engine_names:
+        line = f"  {name:10s} pipeline speedup {totals['reference'][0] / totals[name][0]:5.2f}x"
+        if name in face_engines:
+            line += f"  detection speedup {totals['reference'][1] / totals[name][1]:5.2f}x"
+        print(line)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("All engines within tolerances.")
+    return not failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that the alternative engines match the reference implementations and measure the speedup.")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES),
+                        help="Alternative engines to verify (default is all of them).")
+
+    # Mismos ajustes que main5.py, por defecto los usados para generar resources/procesadas
+    parser.add_argument("--additional_temperature", type=float, default=0,
+                        help="Additional temperature percentage to add (default is 0).")
+    parser.add_argument("--additional_brightness", type=float, default=-10,
+                        help="Additional brightness percentage to add (default is -10).")
+    parser.add_argument("--bronze", type=float, default=30,
+                        help="Additional bronze percentage to add for a tanned effect (default is 30).")
+
+    # Ajustes de la cara, como en main_opencv1.py
+    parser.add_argument("--face_brightness", type=float, default=DEFAULT_FACE_BRIGHTNESS,
+                        help=f"Brightness factor for the face region (default is {DEFAULT_FACE_BRIGHTNESS}).")
+    parser.add_argument("--face_temperature", type=float, default=DEFAULT_FACE_TEMPERATURE,
+                        help=f"Temperature value for the face region (default is {DEFAULT_FACE_TEMPERATURE}).")
+    parser.add_argument("--face_bronze", type=float, default=DEFAULT_FACE_BRONZE,
+                        help=f"Bronze percentage for the face region (default is {DEFAULT_FACE_BRONZE}).")
+
+    # Tolerancias
+    parser.add_argument("--max_diff", type=int, default=DEFAULT_MAX_DIFF,
+                        help=f"Maximum absolute pixel difference against the reference (default is {DEFAULT_MAX_DIFF}).")
+    parser.add_argument("--min_psnr", type=float, default=DEFAULT_MIN_PSNR,
+                        help=f"Minimum PSNR in dB against the reference (default is {DEFAULT_MIN_PSNR}).")
+    parser.add_argument("--min_accepted_psnr", type=float, default=DEFAULT_MIN_ACCEPTED_PSNR,
+                        help=f"Minimum PSNR in dB of the reference against resources/procesadas "
+                             f"(default is {DEFAULT_MIN_ACCEPTED_PSNR}).")
+    parser.add_argument("--min_iou", type=float, default=DEFAULT_MIN_IOU,
+                        help=f"Minimum IoU of the detected face box (default is {DEFAULT_MIN_IOU}).")
+    parser.add_argument("--max_stat_diff", type=float, default=DEFAULT_MAX_STAT_DIFF,
+                        help=f"Maximum difference of the reference-stats adjustments (default is {DEFAULT_MAX_STAT_DIFF}).")
+
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per image, the best one is kept (default is 3).")
+    parser.add_argument("--limit", type=int, help="Only verify the first N images.")
+    parser.add_argument("--skip_faces", action="store_true", help="Do not compare the face detection path.")
+
+    args = parser.parse_args()
+
+    tolerances = {
+        'max_diff': args.max_diff,
+        'min_psnr': args.min_psnr,
+        'min_accepted_psnr': args.min_accepted_psnr,
+        'min_iou': args.min_iou,
+        'max_stat_diff': args.max_stat_diff
+    }
+
+    face_adjustments = (args.face_brightness, args.face_temperature, args.face_bronze)
+
+    passed = verify(args.engines, args.additional_temperature, args.additional_brightness, args.bronze,
+                    face_adjustments, tolerances, args.repeat, args.limit, not args.skip_faces)
+    sys.exit(0 if passed else 1)